@@ -1,71 +1,93 @@
 import ast
+import collections
+import hashlib
+import itertools
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any, Set
-import networkx as nx
+
+# Один скомпилированный паттерн вместо трех проходов по коду функции
+_PLACEHOLDER_RE = re.compile(r'TODO|FIXME|NotImplementedError')
+
+# Белый список встроенных функций и популярных методов Python
+# (module-level frozenset - одна неизменяемая хеш-таблица на все инстансы
+# и безопасный шаринг между worker-процессами)
+_BUILTINS = frozenset({
+    # Встроенные функции Python
+    'print', 'len', 'range', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'open', 'input', 'type', 'isinstance', 'issubclass', 'hasattr', 'getattr', 'setattr',
+    'delattr', 'dir', 'vars', 'help', 'min', 'max', 'sum', 'abs', 'round', 'sorted',
+    'reversed', 'enumerate', 'zip', 'map', 'filter', 'all', 'any', 'next', 'iter',
+    'callable', 'format', 'repr', 'eval', 'exec', 'compile', 'chr', 'ord', 'bin', 'hex',
+    'oct', 'id', 'hash', 'object', 'property', 'staticmethod', 'classmethod',
+    
+    # Методы строк
+    'upper', 'lower', 'title', 'capitalize', 'strip', 'lstrip', 'rstrip', 'split',
+    'join', 'replace', 'find', 'rfind', 'index', 'count', 'startswith', 'endswith',
+    'isalpha', 'isdigit', 'isalnum', 'isspace', 'islower', 'isupper',
+    
+    # Методы списков/множеств
+    'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'index', 'count', 'sort',
+    'reverse', 'copy', 'add', 'update', 'discard',
+    
+    # Методы словарей
+    'keys', 'values', 'items', 'get', 'setdefault', 'update', 'pop', 'popitem',
+    
+    # Методы файлов
+    'read', 'write', 'readline', 'readlines', 'writelines', 'close', 'flush', 'seek', 'tell',
+    
+    # Методы Path
+    'exists', 'is_file', 'is_dir', 'mkdir', 'rmdir', 'unlink', 'rename', 'absolute',
+    'resolve', 'parent', 'name', 'stem', 'suffix', 'is_absolute',
+    
+    # JSON/pickle
+    'load', 'loads', 'dump', 'dumps',
+    
+    # Logging
+    'info', 'debug', 'warning', 'error', 'critical', 'exception', 'log',
+    
+    # Threading
+    'Thread', 'Lock', 'RLock', 'Semaphore', 'Event', 'start', 'join', 'run',
+    
+    # UUID
+    'uuid4', 'uuid1', 'uuid3', 'uuid5',
+    
+    # Flask/Web
+    'route', 'get', 'post', 'put', 'delete', 'patch', 'render_template', 'redirect',
+    'url_for', 'request', 'jsonify', 'send_from_directory',
+    
+    # Datetime
+    'now', 'today', 'strftime', 'strptime', 'datetime', 'date', 'time', 'timedelta',
+    'sleep',  # time.sleep()
+    
+    # Requests
+    'post', 'get', 'put', 'delete', 'patch', 'head', 'options',
+    
+    # NetworkX
+    'DiGraph', 'Graph', 'add_node', 'add_edge', 'nodes', 'edges', 'neighbors',
+    'in_degree', 'out_degree', 'degree',
+    
+    # Исключения
+    'ValueError', 'TypeError', 'KeyError', 'IndexError', 'AttributeError', 'RuntimeError',
+    'NotImplementedError', 'Exception', 'BaseException', 'raise_for_status',
+})
+
+# Entry points и специальные методы - не считаются мертвым кодом
+_ENTRY_POINTS = frozenset({'main', '__init__', '__main__', '__call__', '__str__', '__repr__'})
+
+# С какого количества функций распараллеливать проверки по процессам
+# (ниже порога накладные расходы на spawn/pickle не окупаются)
+_PARALLEL_MIN_FUNCTIONS = 5000
 
 
 class CodeAnalyzer:
     """Анализатор кода - находит проблемы: мертвый код, обрывы, заглушки"""
     
-    # Белый список встроенных функций и популярных методов Python
-    BUILTINS = {
-        # Встроенные функции Python
-        'print', 'len', 'range', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
-        'open', 'input', 'type', 'isinstance', 'issubclass', 'hasattr', 'getattr', 'setattr',
-        'delattr', 'dir', 'vars', 'help', 'min', 'max', 'sum', 'abs', 'round', 'sorted',
-        'reversed', 'enumerate', 'zip', 'map', 'filter', 'all', 'any', 'next', 'iter',
-        'callable', 'format', 'repr', 'eval', 'exec', 'compile', 'chr', 'ord', 'bin', 'hex',
-        'oct', 'id', 'hash', 'object', 'property', 'staticmethod', 'classmethod',
-        
-        # Методы строк
-        'upper', 'lower', 'title', 'capitalize', 'strip', 'lstrip', 'rstrip', 'split',
-        'join', 'replace', 'find', 'rfind', 'index', 'count', 'startswith', 'endswith',
-        'isalpha', 'isdigit', 'isalnum', 'isspace', 'islower', 'isupper',
-        
-        # Методы списков/множеств
-        'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'index', 'count', 'sort',
-        'reverse', 'copy', 'add', 'update', 'discard',
-        
-        # Методы словарей
-        'keys', 'values', 'items', 'get', 'setdefault', 'update', 'pop', 'popitem',
-        
-        # Методы файлов
-        'read', 'write', 'readline', 'readlines', 'writelines', 'close', 'flush', 'seek', 'tell',
-        
-        # Методы Path
-        'exists', 'is_file', 'is_dir', 'mkdir', 'rmdir', 'unlink', 'rename', 'absolute',
-        'resolve', 'parent', 'name', 'stem', 'suffix', 'is_absolute',
-        
-        # JSON/pickle
-        'load', 'loads', 'dump', 'dumps',
-        
-        # Logging
-        'info', 'debug', 'warning', 'error', 'critical', 'exception', 'log',
-        
-        # Threading
-        'Thread', 'Lock', 'RLock', 'Semaphore', 'Event', 'start', 'join', 'run',
-        
-        # UUID
-        'uuid4', 'uuid1', 'uuid3', 'uuid5',
-        
-        # Flask/Web
-        'route', 'get', 'post', 'put', 'delete', 'patch', 'render_template', 'redirect',
-        'url_for', 'request', 'jsonify', 'send_from_directory',
-        
-        # Datetime
-        'now', 'today', 'strftime', 'strptime', 'datetime', 'date', 'time', 'timedelta',
-        'sleep',  # time.sleep()
-        
-        # Requests
-        'post', 'get', 'put', 'delete', 'patch', 'head', 'options',
-        
-        # NetworkX
-        'DiGraph', 'Graph', 'add_node', 'add_edge', 'nodes', 'edges', 'neighbors',
-        'in_degree', 'out_degree', 'degree',
-        
-        # Исключения
-        'ValueError', 'TypeError', 'KeyError', 'IndexError', 'AttributeError', 'RuntimeError',
-        'NotImplementedError', 'Exception', 'BaseException', 'raise_for_status',
-    }
+    # Кеш результатов analyze() по хешу parsed_data
+    # (повторные запуски на неизмененном проекте - watch mode, обновление UI)
+    _cache: Dict[bytes, List[Dict]] = {}
 
     def __init__(self, parsed_data: Dict[str, Any]):
         """Инициализация анализатора
@@ -74,16 +96,22 @@ class CodeAnalyzer:
             parsed_data: Данные от парсера (functions, classes, imports, etc.)
         """
         self.parsed_data = parsed_data
+        self._key = hashlib.blake2b(
+            json.dumps(parsed_data, sort_keys=True, default=str).encode(),
+            digest_size=16
+        ).digest()
         self.issues = []
-        self.call_graph = nx.DiGraph()  # Направленный граф
+        self._nodes = set()  # Имена всех функций проекта
+        self._in_degree = collections.Counter()  # Сколько раз каждую функцию вызывают
+        self._all_functions = None  # frozenset имен функций (лениво)
+        self._all_imports = None  # frozenset импортов (лениво)
         self._build_graph()
 
     def _build_graph(self) -> None:
-        """Строит networkx граф из данных парсера"""
+        """Строит граф вызовов: множество узлов + счетчик входящих вызовов"""
         for func in self.parsed_data['functions']:
-            self.call_graph.add_node(func['name'])
-            for called in func.get('calls', []):
-                self.call_graph.add_edge(func['name'], called)
+            self._nodes.add(func['name'])
+            self._in_degree.update(func.get('calls', ()))
 
     def analyze(self) -> List[Dict]:
         """Запускает все проверки и возвращает список проблем
@@ -91,147 +119,72 @@ class CodeAnalyzer:
         Returns:
             List of Dict с проблемами (type, severity, file, line, message)
         """
-        self.find_dead_code()
-        self.find_broken_calls()
-        self.find_placeholders()
-        self.find_missing_returns()
+        cached = self._cache.get(self._key)
+        if cached is not None:
+            self.issues = cached
+            return cached
+
+        self._analyze_functions_fused()
         self.find_unused_imports()
+        self._cache[self._key] = self.issues
         return self.issues
 
-    def find_dead_code(self) -> None:
-        """Находит функции, которые никто не вызывает (мертвый код)"""
-        for func in self.parsed_data['functions']:
-            func_name = func['name']
-
-            # Пропускаем entry points и специальные методы
-            if func_name in ['main', '__init__', '__main__', '__call__', '__str__', '__repr__']:
-                continue
-            
-            # Пропускаем magic methods
-            if func_name.startswith('__') and func_name.endswith('__'):
-                continue
-            
-            # Пропускаем функции из if __name__ == '__main__' блока
-            # (эти функции часто вызываются вручную, не через код)
-            if func.get('in_main_block', False):
-                continue
-
-            # Проверяем есть ли входящие вызовы
-            if self.call_graph.in_degree(func_name) == 0:
-                self.issues.append({
-                    'type': 'dead_code',
-                    'severity': 'warning',
-                    'file': func['file'],
-                    'line': func['line_start'],
-                    'function': func_name,
-                    'message': f"Function '{func_name}' is never called"
-                })
-
-    def find_broken_calls(self) -> None:
-        """Находит вызовы функций, которые не существуют в проекте"""
-        all_functions = {f['name'] for f in self.parsed_data['functions']}
-        all_imports = {imp['module'] for imp in self.parsed_data['imports']}
-
-        # Добавляем также имена из импортов
-        for imp in self.parsed_data['imports']:
-            all_imports.update(imp.get('names', []))
-
-        for func in self.parsed_data['functions']:
-            for called in func.get('calls', []):
-                # Пропускаем встроенные функции и методы
-                if called in self.BUILTINS:
-                    continue
-                    
-                # Пропускаем приватные методы (начинаются с _)
-                if called.startswith('_'):
-                    continue
-                
-                # Если вызов не в списке функций и не импортирован
-                if called not in all_functions and called not in all_imports:
-                    self.issues.append({
-                        'type': 'broken_call',
-                        'severity': 'error',
-                        'file': func['file'],
-                        'line': func['line_start'],
-                        'function': func['name'],
-                        'message': f"Calls undefined function '{called}'"
-                    })
+    def _analyze_functions_fused(self) -> None:
+        """Все проверки по функциям за один проход списка
 
-    def find_placeholders(self) -> None:
-        """Ищет заглушки: pass, TODO, FIXME, NotImplementedError"""
-        for func in self.parsed_data['functions']:
-            code = func['code']
-
-            # Проверяем на pass (если это единственная строка)
-            if code.strip() == 'pass':
-                self.issues.append({
-                    'type': 'placeholder',
-                    'severity': 'warning',
-                    'file': func['file'],
-                    'line': func['line_start'],
-                    'function': func['name'],
-                    'message': f"Function '{func['name']}' is empty (only 'pass')"
-                })
+        Объединяет мертвый код, обрывы вызовов, заглушки и отсутствующие
+        return - каждый dict функции читается один раз вместо четырех.
+        На больших проектах файлы раскладываются по шардам и проверяются
+        параллельно в пуле процессов.
+        """
+        functions = self.parsed_data['functions']
 
-            # Проверяем TODO/FIXME
-            if 'TODO' in code or 'FIXME' in code:
-                self.issues.append({
-                    'type': 'placeholder',
-                    'severity': 'info',
-                    'file': func['file'],
-                    'line': func['line_start'],
-                    'function': func['name'],
-                    'message': f"Function '{func['name']}' has TODO/FIXME comment"
-                })
+        # Наборы для проверки обрывов вызовов (строятся один раз и кешируются)
+        if self._all_functions is None:
+            self._all_functions = frozenset(f['name'] for f in functions)
+            # Модуль + импортированные имена одним проходом
+            self._all_imports = frozenset(itertools.chain.from_iterable(
+                (imp['module'], *imp.get('names', ()))
+                for imp in self.parsed_data['imports']
+            ))
+        all_functions = self._all_functions
+        all_imports = self._all_imports
 
-            # Проверяем NotImplementedError
-            if 'NotImplementedError' in code:
-                self.issues.append({
-                    'type': 'placeholder',
-                    'severity': 'warning',
-                    'file': func['file'],
-                    'line': func['line_start'],
-                    'function': func['name'],
-                    'message': f"Function '{func['name']}' raises NotImplementedError"
-                })
+        in_degree = dict(self._in_degree)
 
-    def find_missing_returns(self) -> None:
-        """Находит функции с return type аннотацией, но без return statement"""
-        for func in self.parsed_data['functions']:
-            # Если есть аннотация return и это не None/void
-            if func.get('return_type') and func['return_type'] != 'None':
-                code = func['code']
+        if len(functions) >= _PARALLEL_MIN_FUNCTIONS and (os.cpu_count() or 1) > 1:
+            # Шардируем по файлам, чтобы проблемы одного файла шли подряд
+            by_file = collections.defaultdict(list)
+            for func in functions:
+                by_file[func['file']].append(func)
+            shards = list(by_file.values())
 
-                # Ищем 'return' в коде (простая проверка)
-                if 'return' not in code:
-                    self.issues.append({
-                        'type': 'missing_return',
-                        'severity': 'error',
-                        'file': func['file'],
-                        'line': func['line_start'],
-                        'function': func['name'],
-                        'message': f"Function expects return type '{func['return_type']}' but has no return"
-                    })
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for shard_issues in executor.map(
+                        _check_functions_shard, shards,
+                        itertools.repeat(all_functions),
+                        itertools.repeat(all_imports),
+                        itertools.repeat(in_degree)):
+                    self.issues.extend(shard_issues)
+        else:
+            self.issues.extend(
+                _check_functions_shard(functions, all_functions, all_imports, in_degree)
+            )
 
     def find_unused_imports(self) -> None:
         """Находит импорты, которые не используются в коде файла"""
         # Группируем импорты по файлам
-        imports_by_file = {}
+        imports_by_file = collections.defaultdict(list)
         for imp in self.parsed_data['imports']:
-            file = imp['file']
-            if file not in imports_by_file:
-                imports_by_file[file] = []
-            imports_by_file[file].extend(imp['names'])
+            imports_by_file[imp['file']].extend(imp['names'])
 
-        # Собираем все используемые имена в файле
-        for file, imports in imports_by_file.items():
-            # Находим все функции в этом файле
-            file_funcs = [f for f in self.parsed_data['functions'] if f['file'] == file]
+        # Один проход по функциям: файл -> множество используемых имен
+        used_by_file = collections.defaultdict(set)
+        for func in self.parsed_data['functions']:
+            used_by_file[func['file']].update(func.get('calls', ()))
 
-            # Собираем все вызовы
-            used_names = set()
-            for func in file_funcs:
-                used_names.update(func.get('calls', []))
+        for file, imports in imports_by_file.items():
+            used_names = used_by_file[file]
 
             # Проверяем какие импорты не используются
             for imp_name in imports:
@@ -243,3 +196,110 @@ class CodeAnalyzer:
                         'line': 0,  # TODO: можно добавить строку импорта
                         'message': f"Import '{imp_name}' is not used"
                     })
+
+
+def _check_functions_shard(functions: List[Dict],
+                           all_functions: frozenset,
+                           all_imports: frozenset,
+                           in_degree: Dict[str, int]) -> List[Dict]:
+    """Все проверки по функциям для одного шарда
+
+    Функция модульного уровня, чтобы ProcessPoolExecutor мог отправлять
+    шарды в worker-процессы. Аргументы read-only, результат - список проблем.
+
+    Args:
+        functions: Функции шарда (обычно один файл)
+        all_functions: Имена всех функций проекта
+        all_imports: Все импортированные модули и имена
+        in_degree: Сколько раз каждую функцию вызывают
+
+    Returns:
+        List of Dict с проблемами шарда
+    """
+    issues = []
+
+    # Горячие атрибуты - в локальные переменные
+    issues_append = issues.append
+    builtins = _BUILTINS
+    find_markers = _PLACEHOLDER_RE.finditer
+
+    for func in functions:
+        func_name = func['name']
+        file = func['file']
+        line = func['line_start']
+        code = func['code']
+
+        # Общая часть каждой проблемы - собирается один раз на функцию
+        base = {'file': file, 'line': line, 'function': func_name}
+
+        # --- Мертвый код ---
+        # Пропускаем entry points, magic methods и функции
+        # из if __name__ == '__main__' блока
+        if (func_name not in _ENTRY_POINTS
+                and not (func_name.startswith('__') and func_name.endswith('__'))
+                and not func.get('in_main_block', False)
+                and in_degree.get(func_name, 0) == 0):
+            issues_append({
+                'type': 'dead_code',
+                'severity': 'warning',
+                **base,
+                'message': f"Function '{func_name}' is never called"
+            })
+
+        # --- Обрывы вызовов ---
+        for called in func.get('calls', ()):
+            # Одна цепочка с коротким замыканием: встроенные функции,
+            # приватные методы, известные функции и импорты - по возрастанию
+            # стоимости проверки
+            if (called in builtins or called in all_functions
+                    or called in all_imports or called.startswith('_')):
+                continue
+
+            issues_append({
+                    'type': 'broken_call',
+                    'severity': 'error',
+                    **base,
+                    'message': f"Calls undefined function '{called}'"
+                })
+
+        # --- Заглушки: pass, TODO, FIXME, NotImplementedError ---
+        if code.strip() == 'pass':
+            issues_append({
+                'type': 'placeholder',
+                'severity': 'warning',
+                **base,
+                'message': f"Function '{func_name}' is empty (only 'pass')"
+            })
+
+        # Один проход регуляркой вместо трех поисков подстрок
+        markers = {m.group() for m in find_markers(code)}
+
+        if 'TODO' in markers or 'FIXME' in markers:
+            issues_append({
+                'type': 'placeholder',
+                'severity': 'info',
+                **base,
+                'message': f"Function '{func_name}' has TODO/FIXME comment"
+            })
+
+        if 'NotImplementedError' in markers:
+            issues_append({
+                'type': 'placeholder',
+                'severity': 'warning',
+                **base,
+                'message': f"Function '{func_name}' raises NotImplementedError"
+            })
+
+        # --- Аннотация return без return statement ---
+        if func.get('return_type') and func['return_type'] != 'None':
+            # Парсер отмечает наличие ast.Return - без сканирования кода
+            # и без ложных срабатываний на 'return' в строках/комментариях
+            if not func.get('has_return', False):
+                issues_append({
+                    'type': 'missing_return',
+                    'severity': 'error',
+                    **base,
+                    'message': f"Function expects return type '{func['return_type']}' but has no return"
+                })
+
+    return issues
@@ -24,6 +24,8 @@ class Config:
 
     # Настройки анализа
     MAX_FUNCTIONS_PER_BATCH = 10  # Сколько функций описывать за раз
+    MAX_FUNCTION_LINES_IN_PROMPT = 60  # Длиннее - обрезаем середину в промпте
+    LLM_BATCH_TOKEN_BUDGET = 6000  # Примерный бюджет токенов промпта на батч
     SUPPORTED_EXTENSIONS = [".py", ".js", ".ts", ".jsx", ".tsx"]
     IGNORE_DIRS = ["node_modules", "__pycache__", ".git", "venv", "env", ".venv"]
 
@@ -34,4 +36,7 @@ class Config:
 
     # Timeouts
     LLM_TIMEOUT = 60  # секунд на один батч
+    LLM_CONCURRENCY = 4  # Сколько батчей отправлять в LLM параллельно
+    LLM_RPS = 0.5  # Запросов в секунду к LLM API (token bucket)
+    LLM_BURST = 4  # Допустимый всплеск запросов (емкость bucket)
     MAX_FILE_SIZE = 1024 * 1024  # 1MB максимум на файл
@@ -2,10 +2,38 @@
 Генератор простого HTML отчета с визуализацией workflow
 """
 
+import html
 import json
 import sys
+from collections import defaultdict
+from string import Template
 from pathlib import Path
 
+# Цвет ноды -> CSS класс
+_COLOR_CLASSES = {
+    '#F44336': 'error',
+    '#FF9800': 'warning',
+    '#2196F3': 'info',
+}
+
+# Шаблоны повторяющихся фрагментов (создаются один раз на модуль)
+_NODE_TMPL = Template("""
+        <div class="function-node $color_class">
+            <div class="function-name">$label</div>
+            <div class="function-file">📄 $file:$line</div>
+            <div>$title</div>
+""")
+
+_CALL_TMPL = Template('<div><span class="call-arrow">→</span>$label ($file)</div>')
+
+_ISSUE_TMPL = Template("""
+                <div class="issue $severity">
+                    <strong>$type</strong><br>
+                    $message<br>
+                    <small>📄 $file:$line</small>
+                </div>
+""")
+
 
 def generate_html_report(results_json_path: str, output_html: str):
     """
@@ -23,8 +51,9 @@ def generate_html_report(results_json_path: str, output_html: str):
     stats = data['stats']
     issues = data['issues']
 
-    # Создаем HTML
-    html = f"""<!DOCTYPE html>
+    # Пишем HTML сразу в файл - без накопления гигантской строки
+    with open(output_html, 'w', encoding='utf-8') as out:
+        out.write(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -152,81 +181,77 @@ def generate_html_report(results_json_path: str, output_html: str):
     <div class="workflow-section">
         <h2>🔄 Workflow & Dependencies</h2>
         <p>Total connections: {len(graph['edges'])}</p>
-"""
+""")
 
-    # Создаем словарь узлов для быстрого доступа
-    nodes_dict = {node['id']: node for node in graph['nodes']}
-
-    # Группируем edges по from (кто вызывает)
-    calls_by_function = {}
-    for edge in graph['edges']:
-        from_id = edge['from']
-        to_id = edge['to']
-
-        if from_id not in calls_by_function:
-            calls_by_function[from_id] = []
-        calls_by_function[from_id].append(to_id)
-
-    # Показываем все функции и их вызовы
-    for node_id, node in nodes_dict.items():
-        color_class = ""
-        if node['color'] == '#F44336':
-            color_class = "error"
-        elif node['color'] == '#FF9800':
-            color_class = "warning"
-        elif node['color'] == '#2196F3':
-            color_class = "info"
-
-        html += f"""
-        <div class="function-node {color_class}">
-            <div class="function-name">{node['label']}</div>
-            <div class="function-file">📄 {node['data']['file']}:{node['data']['line']}</div>
-            <div>{node['title'][:200]}...</div>
-"""
+        # Создаем словарь узлов для быстрого доступа
+        nodes_dict = {node['id']: node for node in graph['nodes']}
+
+        # Группируем edges по from (кто вызывает)
+        calls_by_function = defaultdict(list)
+        for edge in graph['edges']:
+            calls_by_function[edge['from']].append(edge['to'])
+
+        # Показываем все функции и их вызовы
+        for node_id, node in nodes_dict.items():
+            color_class = _COLOR_CLASSES.get(node['color'], '')
 
-        # Показываем что эта функция вызывает
-        if node_id in calls_by_function:
-            calls = calls_by_function[node_id]
-            html += '<div class="function-calls"><strong>Calls:</strong><br>'
-            for call_id in calls[:10]:  # Показываем первые 10
-                called_node = nodes_dict.get(call_id)
-                if called_node:
-                    html += f'<div><span class="call-arrow">→</span>{called_node["label"]} ({called_node["data"]["file"]})</div>'
-            if len(calls) > 10:
-                html += f'<div>... and {len(calls) - 10} more</div>'
-            html += '</div>'
-
-        html += '</div>'
-
-    html += """
+            # Обрезаем описание только когда оно реально длинное
+            title = node['title']
+            if len(title) > 200:
+                title = title[:200] + '...'
+
+            out.write(_NODE_TMPL.substitute(
+                color_class=color_class,
+                label=html.escape(node['label']),
+                file=html.escape(node['data']['file']),
+                line=node['data']['line'],
+                title=html.escape(title)
+            ))
+
+            # Показываем что эта функция вызывает
+            if node_id in calls_by_function:
+                calls = calls_by_function[node_id]
+                out.write('<div class="function-calls"><strong>Calls:</strong><br>')
+                shown = calls if len(calls) <= 10 else calls[:10]  # Показываем первые 10
+                for call_id in shown:
+                    called_node = nodes_dict.get(call_id)
+                    if called_node:
+                        out.write(_CALL_TMPL.substitute(
+                            label=html.escape(called_node['label']),
+                            file=html.escape(called_node['data']['file'])
+                        ))
+                if len(calls) > 10:
+                    out.write(f'<div>... and {len(calls) - 10} more</div>')
+                out.write('</div>')
+
+            out.write('</div>')
+
+        out.write("""
     </div>
 
     <div class="issues-section">
         <h2>⚠️ Issues Found</h2>
-"""
+""")
 
-    # Показываем issues
-    for category, category_issues in issues.items():
-        if category_issues:
-            html += f"<h3>{category.upper()} ({len(category_issues)})</h3>"
-            for issue in category_issues[:20]:  # Первые 20
-                html += f"""
-                <div class="issue {issue['severity']}">
-                    <strong>{issue['type'].replace('_', ' ').upper()}</strong><br>
-                    {issue['message']}<br>
-                    <small>📄 {issue['file']}:{issue.get('line', 'N/A')}</small>
-                </div>
-"""
+        # Показываем issues
+        for category, category_issues in issues.items():
+            if category_issues:
+                out.write(f"<h3>{category.upper()} ({len(category_issues)})</h3>")
+                for issue in category_issues[:20]:  # Первые 20
+                    out.write(_ISSUE_TMPL.substitute(
+                        severity=issue['severity'],
+                        type=issue['type'].replace('_', ' ').upper(),
+                        message=html.escape(issue['message']),
+                        file=html.escape(issue['file']),
+                        line=issue.get('line', 'N/A')
+                    ))
 
-    html += """
+        out.write("""
     </div>
 
 </body>
 </html>
-"""
-
-    with open(output_html, 'w', encoding='utf-8') as f:
-        f.write(html)
+""")
 
     print(f"✓ HTML report generated: {output_html}")
     print(f"✓ Open in browser: file:///{Path(output_html).absolute()}")
@@ -1,12 +1,127 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
 import json
 import logging
+import re
+import threading
+from pathlib import Path
+
+try:
+    import orjson  # ~2x быстрее stdlib json на decode
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Callable, Optional
 from config import Config
 import time
 
 logger = logging.getLogger(__name__)
 
+# Статический заголовок промпта - создается один раз на модуль,
+# а не на каждый батч
+_PROMPT_HEADER = """Ты - эксперт по анализу кода. Твоя задача - дать МАКСИМАЛЬНО ДЕТАЛЬНОЕ описание каждой функции на РУССКОМ языке.
+
+КРИТИЧЕСКИ ВАЖНО: Описание должно быть настолько подробным, чтобы разработчик, который видит код первый раз, полностью понял:
+1. ЧТО делает функция (её назначение в проекте)
+2. КАК она это делает (пошаговая логика, алгоритм)
+3. КАКИЕ конкретные данные принимает (типы, форматы, примеры значений)
+4. ЧТО возвращает (тип результата, возможные варианты)
+5. КАКИЕ другие функции/модули/библиотеки использует
+6. КАКИЕ особые случаи или условия обрабатывает
+7. КАКИЕ конкретные настройки/параметры/константы использует (с их значениями!)
+
+ПРИМЕРЫ ХОРОШЕГО ОПИСАНИЯ:
+- "Функция convert_text_to_speech преобразует текст в аудио. Она принимает строку text и словарь настроек settings. Внутри функция: 1) Очищает текст от специальных символов через regex r'[^\w\s]', 2) Разбивает на предложения по точкам, 3) Для каждого предложения вызывает TTS API с параметрами: voice='ru-RU-Wavenet-D', speed=1.2, pitch=0, 4) Склеивает аудио через pydub. Возвращает путь к итоговому MP3 файлу."
+
+- "Функция filter_special_chars удаляет все знаки препинания из текста. Конкретно удаляет: . , ! ? ; : - ( ) [ ] { } ' \" / \ @ # $ % ^ & *. Использует метод str.translate() с таблицей маппинга. Возвращает очищенную строку в lowercase."
+
+ФОРМАТ ОТВЕТА - чистый JSON массив (без markdown, без комментариев):
+[
+  {
+    "name": "function_name",
+    "description": "Детальное описание на русском языке..."
+  }
+]
+
+Функции для анализа:
+"""
+
+# Markdown-фенсы вокруг JSON ответа LLM: ```json в начале и ``` в конце
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+# Персистентный кеш описаний: хеш(модель + код функции) -> описание.
+# При повторном анализе неизмененные функции не ходят в LLM вообще.
+_CACHE_FILE = Path(__file__).parent / '.llm_cache.json'
+
+
+class TokenBucket:
+    """Token bucket rate limiter - вместо фиксированного sleep между батчами
+
+    Пропускает запросы с заданной скоростью, разрешая короткие всплески
+    до capacity. Потокобезопасен - используется из пула потоков.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """Инициализация bucket
+
+        Args:
+            rate: Скорость пополнения (токенов/запросов в секунду)
+            capacity: Максимум накопленных токенов (размер всплеска)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Блокируется, пока не появится свободный токен"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class LeakyBucket:
+    """Leaky bucket - выравнивает исходящий поток запросов
+
+    Token bucket разрешает всплеск до capacity на старте, из-за чего
+    провайдер может ответить шквалом 429. Leaky bucket поверх него
+    выпускает запросы строго раз в 1/rate секунд - всплеск сглаживается,
+    установившаяся пропускная способность не меняется.
+    """
+
+    def __init__(self, rate: float):
+        """Инициализация bucket
+
+        Args:
+            rate: Скорость выпуска (запросов в секунду)
+        """
+        self.interval = 1.0 / rate
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Блокируется до своего слота отправки"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
 
 class FunctionDescriber:
     """Генерирует описания функций через LLM (OpenRouter API)"""
@@ -22,53 +137,107 @@ class FunctionDescriber:
         self.model = model or Config.LLM_MODEL
         self.base_url = Config.OPENROUTER_BASE_URL
         self.timeout = Config.LLM_TIMEOUT
+        self.limiter = TokenBucket(rate=Config.LLM_RPS, capacity=Config.LLM_BURST)
+        self.pacer = LeakyBucket(rate=Config.LLM_RPS)
+
+        # Одна Session на describer: keep-alive вместо нового TCP+TLS
+        # handshake на каждый батч + автоматические ретраи на 429/5xx
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=Config.LLM_CONCURRENCY,
+            pool_maxsize=Config.LLM_CONCURRENCY,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=1.0,
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True,
+                allowed_methods=['POST']
+            )
+        )
+        self.session.mount('https://', adapter)
 
-    def _build_prompt(self, functions: List[Dict]) -> str:
-        """Создает промпт для LLM с четкими инструкциями
+        self._desc_cache = self._load_cache()
+
+    def _cache_key(self, func: Dict) -> str:
+        """Ключ кеша описаний: хеш модели и кода функции
 
         Args:
-            functions: Список функций для описания
+            func: Данные функции
 
         Returns:
-            Промпт в виде строки
+            Hex-строка ключа
         """
-        prompt = """Ты - эксперт по анализу кода. Твоя задача - дать МАКСИМАЛЬНО ДЕТАЛЬНОЕ описание каждой функции на РУССКОМ языке.
+        raw = (self.model + '\0' + func.get('code', '')).encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
 
-КРИТИЧЕСКИ ВАЖНО: Описание должно быть настолько подробным, чтобы разработчик, который видит код первый раз, полностью понял:
-1. ЧТО делает функция (её назначение в проекте)
-2. КАК она это делает (пошаговая логика, алгоритм)
-3. КАКИЕ конкретные данные принимает (типы, форматы, примеры значений)
-4. ЧТО возвращает (тип результата, возможные варианты)
-5. КАКИЕ другие функции/модули/библиотеки использует
-6. КАКИЕ особые случаи или условия обрабатывает
-7. КАКИЕ конкретные настройки/параметры/константы использует (с их значениями!)
+    def _load_cache(self) -> Dict[str, str]:
+        """Загружает кеш описаний с диска (пустой dict при отсутствии/ошибке)"""
+        try:
+            with open(_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            logger.info(f"Loaded {len(cache)} cached descriptions from {_CACHE_FILE}")
+            return cache
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        """Сохраняет кеш описаний на диск"""
+        try:
+            with open(_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self._desc_cache, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Could not save description cache: {e}")
 
-ПРИМЕРЫ ХОРОШЕГО ОПИСАНИЯ:
-- "Функция convert_text_to_speech преобразует текст в аудио. Она принимает строку text и словарь настроек settings. Внутри функция: 1) Очищает текст от специальных символов через regex r'[^\w\s]', 2) Разбивает на предложения по точкам, 3) Для каждого предложения вызывает TTS API с параметрами: voice='ru-RU-Wavenet-D', speed=1.2, pitch=0, 4) Склеивает аудио через pydub. Возвращает путь к итоговому MP3 файлу."
+    def _trim_code(self, code: str, max_lines: int = None) -> str:
+        """Обрезает середину слишком длинной функции для промпта
 
-- "Функция filter_special_chars удаляет все знаки препинания из текста. Конкретно удаляет: . , ! ? ; : - ( ) [ ] { } ' \" / \ @ # $ % ^ & *. Использует метод str.translate() с таблицей маппинга. Возвращает очищенную строку в lowercase."
+        Сигнатура и начало + конец остаются, середина заменяется маркером.
+        Экономит токены и не дает гигантским функциям вытеснять остальные
+        из контекста модели.
 
-ФОРМАТ ОТВЕТА - чистый JSON массив (без markdown, без комментариев):
-[
-  {
-    "name": "function_name",
-    "description": "Детальное описание на русском языке..."
-  }
-]
+        Args:
+            code: Исходный код функции
+            max_lines: Максимум строк (по умолчанию из Config)
 
-Функции для анализа:
-"""
+        Returns:
+            Код целиком или с вырезанной серединой
+        """
+        if max_lines is None:
+            max_lines = Config.MAX_FUNCTION_LINES_IN_PROMPT
+
+        lines = code.splitlines()
+        if len(lines) <= max_lines:
+            return code
+
+        head = lines[:max_lines // 2]
+        tail = lines[-(max_lines // 2):]
+        omitted = len(lines) - len(head) - len(tail)
+        return '\n'.join(head + [f'    # ... {omitted} строк пропущено ...'] + tail)
+
+    def _build_prompt(self, functions: List[Dict]) -> str:
+        """Создает промпт для LLM с четкими инструкциями
+
+        Args:
+            functions: Список функций для описания
+
+        Returns:
+            Промпт в виде строки
+        """
 
+        # Собираем кусками и склеиваем один раз - без O(N^2) конкатенации
+        parts = [_PROMPT_HEADER]
         for i, func in enumerate(functions, 1):
-            prompt += f"\n\n--- Функция {i} ---\n"
-            prompt += f"Имя: {func['name']}\n"
-            prompt += f"Файл: {func['file']}\n"
-            prompt += f"Параметры: {func.get('params', [])}\n"
+            parts.append(
+                f"\n\n--- Функция {i} ---\n"
+                f"Имя: {func['name']}\n"
+                f"Файл: {func['file']}\n"
+                f"Параметры: {func.get('params', [])}\n"
+            )
             if func.get('docstring'):
-                prompt += f"Docstring: {func['docstring']}\n"
-            prompt += f"Код:\n```python\n{func['code']}\n```\n"
+                parts.append(f"Docstring: {func['docstring']}\n")
+            parts.append(f"Код:\n```python\n{self._trim_code(func['code'])}\n```\n")
 
-        return prompt
+        return ''.join(parts)
 
     def _parse_response(self, response_text: str, functions: List[Dict]) -> List[Dict]:
         """Парсит JSON ответ от LLM и добавляет описания к функциям
@@ -80,19 +249,16 @@ class FunctionDescriber:
         Returns:
             Функции с добавленным полем 'description'
         """
+        loads = orjson.loads if orjson is not None else json.loads
+
         try:
-            # Убираем возможные markdown блоки
-            clean_text = response_text.strip()
-            if clean_text.startswith('```json'):
-                clean_text = clean_text[7:]  # Убираем ```json
-            if clean_text.startswith('```'):
-                clean_text = clean_text[3:]  # Убираем ```
-            if clean_text.endswith('```'):
-                clean_text = clean_text[:-3]  # Убираем ```
-            clean_text = clean_text.strip()
-            
-            # Пытаемся распарсить JSON
-            descriptions = json.loads(clean_text)
+            # Многие модели возвращают чистый JSON без фенсов - сначала
+            # парсим сырой текст, markdown снимаем только при неудаче
+            try:
+                descriptions = loads(response_text)
+            except ValueError:
+                clean_text = _FENCE_RE.sub('', response_text.strip()).strip()
+                descriptions = loads(clean_text)
 
             # Создаем словарь для быстрого поиска
             desc_map = {d['name']: d['description'] for d in descriptions}
@@ -123,16 +289,23 @@ class FunctionDescriber:
         Returns:
             Функции с добавленным полем 'description'
         """
-        logger.info(f"    Sending batch of {len(functions)} functions to LLM...")
-        logger.info(f"    Model: {self.model}")
-        logger.info(f"    Functions: {[f['name'] for f in functions]}")
-
+        # Детали батча - только на DEBUG, с ленивым %s-форматированием
+        # (на INFO эти строки даже не собираются)
+        logger.debug("    Sending batch of %d functions to LLM (model: %s)", len(functions), self.model)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("    Functions: %s", [f['name'] for f in functions])
+
+        # Промпт собираем ДО ожидания rate limit - пока воркер ждет свой
+        # слот, его промпт уже готов, а соседние воркеры строят свои
         prompt = self._build_prompt(functions)
-        logger.info(f"    Prompt length: {len(prompt)} chars")
+        logger.debug("    Prompt length: %d chars", len(prompt))
+
+        # Ждем свободный токен - защита от rate limit вместо фиксированного sleep
+        self.limiter.acquire()
 
         # Логируем частичный ключ для безопасности
-        if len(self.api_key) > 24:
-            logger.info(f"    API Key: {self.api_key[:20]}...{self.api_key[-4:]}")
+        if len(self.api_key) > 24 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("    API Key: %s...%s", self.api_key[:20], self.api_key[-4:])
 
         # НО отправляем ПОЛНЫЙ ключ
         headers = {
@@ -151,25 +324,39 @@ class FunctionDescriber:
         }
 
         try:
-            logger.info(f"    Making API call to {self.base_url}/chat/completions")
-            response = requests.post(
+            logger.debug("    Making API call to %s/chat/completions", self.base_url)
+            # Кодируем payload сами через orjson - requests' json= использует
+            # stdlib json, что заметно на промптах в десятки KB
+            if orjson is not None:
+                body = orjson.dumps(data)
+            else:
+                body = json.dumps(data).encode('utf-8')
+
+            # Выравниваем исходящий поток прямо перед отправкой:
+            # token bucket уже пропустил запрос, leaky bucket держит темп
+            self.pacer.wait()
+            response = self.session.post(
                 f'{self.base_url}/chat/completions',
                 headers=headers,
-                json=data,
+                data=body,
                 timeout=self.timeout
             )
 
-            logger.info(f"    Response status: {response.status_code}")
+            logger.debug("    Response status: %d", response.status_code)
             response.raise_for_status()
 
-            result = response.json()
+            if orjson is not None:
+                result = orjson.loads(response.content)
+            else:
+                result = response.json()
             description_text = result['choices'][0]['message']['content']
 
-            logger.info(f"    Response length: {len(description_text)} chars")
-            logger.info(f"    Response preview: {description_text[:200]}...")
+            logger.debug("    Response length: %d chars", len(description_text))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("    Response preview: %s...", description_text[:200])
 
             parsed = self._parse_response(description_text, functions)
-            logger.info(f"    ✓ Batch processed successfully ({len(parsed)} functions)")
+            logger.debug("    ✓ Batch processed successfully (%d functions)", len(parsed))
 
             return parsed
 
@@ -202,33 +389,96 @@ class FunctionDescriber:
         Returns:
             Все функции с описаниями
         """
-        described = []
         total = len(all_functions)
         batch_size = Config.MAX_FUNCTIONS_PER_BATCH
 
-        logger.info(f"  Processing {total} functions in batches of {batch_size}")
-        num_batches = (total + batch_size - 1) // batch_size
-        logger.info(f"  Total batches: {num_batches}")
-
-        for batch_num, i in enumerate(range(0, total, batch_size), 1):
-            batch = all_functions[i:i+batch_size]
-
-            logger.info(f"  === Batch {batch_num}/{num_batches} ===")
-
-            if progress_callback:
-                progress = 60 + (i / total) * 30  # 60-90% общего прогресса
-                progress_callback(f"Describing functions {i+1}-{min(i+batch_size, total)}...", progress)
-
-            described_batch = self.describe_functions_batch(batch)
-            described.extend(described_batch)
-
-            logger.info(f"  Batch {batch_num} complete. Total described so far: {len(described)}/{total}")
-
-            # Увеличенная задержка между батчами (rate limiting protection)
-            if i + batch_size < total:
-                logger.info(f"  Waiting 3s before next batch...")
-                time.sleep(3)  # Увеличил с 1s до 3s
+        # Сначала раздаем описания из кеша - в LLM идут только новые/измененные
+        pending = []
+        for func in all_functions:
+            cached_desc = self._desc_cache.get(self._cache_key(func))
+            if cached_desc is not None:
+                func['description'] = cached_desc
+            else:
+                pending.append(func)
+
+        logger.info(f"  {total - len(pending)}/{total} descriptions served from cache")
+
+        if not pending:
+            return all_functions
+
+        # Дедупликация: одинаковый код (boilerplate, copy-paste) описываем
+        # один раз и раздаем описание всем дубликатам
+        groups: Dict[str, List[Dict]] = {}
+        for func in pending:
+            groups.setdefault(self._cache_key(func), []).append(func)
+        unique_functions = [dupes[0] for dupes in groups.values()]
+
+        if len(unique_functions) < len(pending):
+            logger.info(f"  Deduplicated {len(pending)} functions to {len(unique_functions)} unique bodies")
+
+        # Жадная упаковка батчей по бюджету токенов: мелкие функции едут
+        # кучнее (меньше round-trip), крупные не переполняют контекст модели
+        token_budget = Config.LLM_BATCH_TOKEN_BUDGET
+        batches = []
+        batch = []
+        est_tokens = 0
+        for func in unique_functions:
+            batch.append(func)
+            # ~4 символа на токен + накладные на обвязку промпта
+            est_tokens += len(self._trim_code(func.get('code', ''))) // 4 + 200
+            if est_tokens >= token_budget or len(batch) >= batch_size:
+                batches.append(batch)
+                batch = []
+                est_tokens = 0
+        if batch:
+            batches.append(batch)
+
+        logger.info(f"  Packed {len(unique_functions)} functions into {len(batches)} batches "
+                    f"(budget {token_budget} tokens, max {batch_size} functions)")
+        num_batches = len(batches)
+        logger.info(f"  Total batches: {num_batches} ({Config.LLM_CONCURRENCY} in parallel)")
+
+        # Батчи - чистый I/O (HTTPS к OpenRouter), поэтому отправляем
+        # несколько параллельно через пул потоков
+        results = {}  # индекс батча -> описанные функции
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=Config.LLM_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self.describe_functions_batch, batch): idx
+                for idx, batch in enumerate(batches)
+            }
+
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                completed += 1
+
+                logger.info(f"  Batch {idx+1} complete ({completed}/{num_batches})")
+
+                if progress_callback:
+                    progress = 60 + (completed / num_batches) * 30  # 60-90% общего прогресса
+                    progress_callback(f"Described {completed}/{num_batches} batches...", progress)
+
+        # Собираем результаты в исходном порядке батчей
+        described = []
+        for idx in range(num_batches):
+            described.extend(results[idx])
+
+        # Раздаем описания дубликатам
+        for dupes in groups.values():
+            desc = dupes[0].get('description')
+            for dup in dupes[1:]:
+                dup['description'] = desc
+
+        # Пополняем кеш (ошибки/таймауты не кешируем - их стоит переспросить)
+        for func in described:
+            desc = func.get('description', '')
+            if desc and not desc.endswith(('(timeout)', '(API error)', '(error)')):
+                self._desc_cache[self._cache_key(func)] = desc
+        self._save_cache()
 
         logger.info(f"  All batches complete! Total functions described: {len(described)}")
 
-        return described
+        # Функции описывались на месте - возвращаем полный список в исходном порядке
+        return all_functions
@@ -1,7 +1,13 @@
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, Callable, Optional
 import json
 import logging
+
+try:
+    import orjson  # Быстрая (де)сериализация больших результатов
+except ImportError:
+    orjson = None
 from config import Config
 from parser import CodeParser
 from analyzer import CodeAnalyzer
@@ -11,6 +17,13 @@ from visualizer import DataVisualizer
 logger = logging.getLogger(__name__)
 
 
+def _dump_json_bytes(obj: Any) -> bytes:
+    """Сериализует объект в JSON bytes (orjson или stdlib fallback)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
 class ProjectAnalyzer:
     """Оркестратор - связывает все модули, управляет процессом анализа"""
 
@@ -52,10 +65,11 @@ class ProjectAnalyzer:
             logger.info(f"  - Total classes: {len(parsed_data.get('classes', []))}")
             logger.info(f"  - Total imports: {len(parsed_data.get('imports', []))}")
 
-            # Логируем первые 5 функций
-            logger.info("  - First 5 functions:")
-            for i, func in enumerate(parsed_data.get('functions', [])[:5]):
-                logger.info(f"    {i+1}. {func.get('name')} in {func.get('file')} (line {func.get('line_start')})")
+            # Логируем первые 5 функций (только на DEBUG)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("  - First 5 functions:")
+                for i, func in enumerate(parsed_data.get('functions', [])[:5]):
+                    logger.debug("    %d. %s in %s (line %s)", i + 1, func.get('name'), func.get('file'), func.get('line_start'))
 
             if progress_callback:
                 progress_callback("Building call graph...", 30)
@@ -72,11 +86,14 @@ class ProjectAnalyzer:
             analyzer = CodeAnalyzer(parsed_data)
             issues = analyzer.analyze()
 
+            # Один проход по issues вместо трех list comprehension
+            sev_counts = Counter(i['severity'] for i in issues)
+
             logger.info(f"✓ Analysis complete!")
             logger.info(f"  - Total issues: {len(issues)}")
-            logger.info(f"  - Errors: {len([i for i in issues if i['severity'] == 'error'])}")
-            logger.info(f"  - Warnings: {len([i for i in issues if i['severity'] == 'warning'])}")
-            logger.info(f"  - Info: {len([i for i in issues if i['severity'] == 'info'])}")
+            logger.info(f"  - Errors: {sev_counts['error']}")
+            logger.info(f"  - Warnings: {sev_counts['warning']}")
+            logger.info(f"  - Info: {sev_counts['info']}")
 
             # Этап 3: Генерация описаний через LLM (60-90%)
             if progress_callback:
@@ -96,19 +113,18 @@ class ProjectAnalyzer:
                 progress_callback=progress_callback
             )
 
+            total_functions = len(parsed_data['functions'])
             logger.info(f"✓ LLM descriptions complete!")
-            logger.info(f"  - Functions sent: {len(parsed_data['functions'])}")
+            logger.info(f"  - Functions sent: {total_functions}")
             logger.info(f"  - Functions described: {len(functions_with_descriptions)}")
-            logger.info(f"  - Success rate: {len(functions_with_descriptions) / max(len(parsed_data['functions']), 1) * 100:.1f}%")
+            logger.info(f"  - Success rate: {len(functions_with_descriptions) / max(total_functions, 1) * 100:.1f}%")
 
-            # Логируем первую описанную функцию
-            if functions_with_descriptions:
-                logger.info("  - First described function:")
+            # Логируем первую описанную функцию (только на DEBUG)
+            if functions_with_descriptions and logger.isEnabledFor(logging.DEBUG):
                 first = functions_with_descriptions[0]
-                logger.info(f"    Name: {first.get('name')}")
-                logger.info(f"    File: {first.get('file')}")
-                logger.info(f"    Description: {first.get('description', 'N/A')[:100]}...")
-                logger.info(f"    Has calls: {len(first.get('calls', []))} calls")
+                logger.debug("  - First described function: %s in %s", first.get('name'), first.get('file'))
+                logger.debug("    Description: %s...", first.get('description', 'N/A')[:100])
+                logger.debug("    Has calls: %d calls", len(first.get('calls', [])))
 
             # Этап 4: Подготовка визуализации (90-100%)
             if progress_callback:
@@ -130,20 +146,14 @@ class ProjectAnalyzer:
             logger.info(f"  - File tree items: {len(self.results['file_tree'])}")
             logger.info(f"  - Issues grouped: {sum(len(v) for v in self.results['issues'].values())}")
 
-            # Логируем первую ноду графа
-            if self.results['graph']['nodes']:
-                logger.info("  - First graph node:")
-                first_node = self.results['graph']['nodes'][0]
-                logger.info(f"    ID: {first_node.get('id')}")
-                logger.info(f"    Label: {first_node.get('label')}")
-                logger.info(f"    Color: {first_node.get('color')}")
-
-            # Логируем первый edge
-            if self.results['graph']['edges']:
-                logger.info("  - First graph edge:")
-                first_edge = self.results['graph']['edges'][0]
-                logger.info(f"    From: {first_edge.get('from')}")
-                logger.info(f"    To: {first_edge.get('to')}")
+            # Логируем первую ноду и первый edge графа (только на DEBUG)
+            if logger.isEnabledFor(logging.DEBUG):
+                if self.results['graph']['nodes']:
+                    first_node = self.results['graph']['nodes'][0]
+                    logger.debug("  - First graph node: %s (color: %s)", first_node.get('id'), first_node.get('color'))
+                if self.results['graph']['edges']:
+                    first_edge = self.results['graph']['edges'][0]
+                    logger.debug("  - First graph edge: %s -> %s", first_edge.get('from'), first_edge.get('to'))
 
             if progress_callback:
                 progress_callback("Analysis complete!", 100)
@@ -170,8 +180,17 @@ class ProjectAnalyzer:
         if not self.results:
             raise ValueError("No results to save. Run analyze_project() first.")
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, indent=2, ensure_ascii=False)
+        # Пишем по top-level ключам (graph, file_tree, issues, stats) -
+        # в памяти никогда не живет сериализация всего результата сразу
+        with open(output_path, 'wb') as f:
+            f.write(b'{')
+            for i, (key, value) in enumerate(self.results.items()):
+                if i:
+                    f.write(b',')
+                f.write(_dump_json_bytes(key))
+                f.write(b':')
+                f.write(_dump_json_bytes(value))
+            f.write(b'}')
 
     def load_results(self, input_path: str) -> Dict[str, Any]:
         """Загружает результаты из JSON файла
@@ -182,6 +201,10 @@ class ProjectAnalyzer:
         Returns:
             Dict с результатами
         """
-        with open(input_path, 'r', encoding='utf-8') as f:
-            self.results = json.load(f)
+        if orjson is not None:
+            with open(input_path, 'rb') as f:
+                self.results = orjson.loads(f.read())
+        else:
+            with open(input_path, 'r', encoding='utf-8') as f:
+                self.results = json.load(f)
         return self.results
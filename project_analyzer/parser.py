@@ -1,5 +1,11 @@
 import ast
+import hashlib
+import itertools
 import os
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import json
 import logging
@@ -8,6 +14,379 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Меньше файлов парсим последовательно - спавн пула дороже выигрыша
+_PARALLEL_MIN_FILES = 8
+
+# Фильтры обхода, замороженные на загрузке модуля: endswith принимает
+# tuple нативно, проверка директорий идет по frozenset
+_SUPPORTED_SUFFIXES = tuple(Config.SUPPORTED_EXTENSIONS)
+_IGNORE_SET = frozenset(Config.IGNORE_DIRS)
+
+# ast.unparse появился в 3.9 - биндим один раз вместо hasattr на каждую функцию
+_UNPARSE = getattr(ast, 'unparse', None)
+
+
+def _docstring(node) -> Optional[str]:
+    """Docstring узла с быстрой проверкой перед ast.get_docstring
+
+    У большинства узлов docstring нет - дешевый isinstance-фильтр
+    отсекает их без захода в get_docstring с его cleandoc.
+
+    Args:
+        node: AST узел функции, класса или модуля
+
+    Returns:
+        Docstring или None
+    """
+    body = node.body
+    if (body and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)):
+        return ast.get_docstring(node)
+    return None
+
+# Дисковый кеш результатов извлечения: неизмененные файлы на повторных
+# запусках не парсятся вообще - только хеш + pickle.load
+_CACHE_DIR = Path(__file__).parent / '.cache' / 'ast'
+_EXTRACT_SCHEMA = 3  # Поднять при изменении формата результата _parse_file_worker
+_CACHE_TAG = f"py{sys.version_info.major}{sys.version_info.minor}-v{_EXTRACT_SCHEMA}"
+
+
+def _cache_path(file_path: Path, raw: bytes) -> Path:
+    """Путь кеш-файла для содержимого raw
+
+    Имя файла входит в ключ: поле 'file' в результате зависит от имени,
+    и два одинаковых файла с разными именами не должны делить запись.
+
+    Args:
+        file_path: Путь к исходному файлу
+        raw: Содержимое файла в байтах
+
+    Returns:
+        Путь к .pkl файлу в кеше
+    """
+    h = hashlib.sha256(file_path.name.encode('utf-8'))
+    h.update(b'\0')
+    h.update(raw)
+    return _CACHE_DIR / f"{h.hexdigest()}-{_CACHE_TAG}.pkl"
+
+
+def _cache_store(cache_path: Path, result: Dict[str, List]) -> None:
+    """Атомарно сохраняет результат извлечения: tempfile + rename
+
+    Args:
+        cache_path: Целевой путь в кеше
+        result: Результат от _parse_file_worker
+    """
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write AST cache entry: {e}")
+
+
+def _iter_source_files(root: str) -> Any:
+    """Рекурсивно обходит дерево через os.scandir и отдает пути файлов
+
+    os.walk делает лишний stat на каждую запись и возвращает строки,
+    которые потом склеиваются в Path. scandir отдает DirEntry с уже
+    закешированным типом из одного syscall - на деревьях в десятки
+    тысяч записей это заметно быстрее.
+
+    Args:
+        root: Корневая директория проекта
+
+    Yields:
+        str пути к файлам с поддерживаемыми расширениями
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _IGNORE_SET:
+                            stack.append(entry.path)
+                    elif entry.name.endswith(_SUPPORTED_SUFFIXES):
+                        yield entry.path
+        except OSError as e:
+            logger.warning(f"Cannot scan directory {current}: {e}")
+
+
+def _parse_file_worker(file_path: str) -> Dict[str, List]:
+    """Парсит один файл и возвращает независимый результат
+
+    Чистая функция модульного уровня: не трогает состояние парсера,
+    поэтому ProcessPoolExecutor может выполнять ее в дочерних процессах.
+
+    Args:
+        file_path: Путь к файлу для парсинга (строка - дешевле пиклится)
+
+    Returns:
+        Dict с ключами functions, classes, imports для этого файла
+    """
+    result = {'files': [], 'functions': [], 'classes': [], 'imports': []}
+    path = Path(file_path)
+
+    try:
+        # Проверка размера ДО чтения - слишком большой файл вообще
+        # не открывается, одного stat достаточно
+        if os.path.getsize(file_path) > Config.MAX_FILE_SIZE:
+            logger.warning(f"File too large, skipping: {path}")
+            return result  # Пропускаем слишком большие файлы
+
+        # Читаем байты как есть - без декодирования на входе
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        # Парсинг Python
+        if path.suffix == '.py':
+            # Кеш по содержимому: на warm run вместо ast.parse + извлечения
+            # остается хеш и pickle.load
+            cache_path = _cache_path(path, raw)
+            try:
+                with open(cache_path, 'rb') as f:
+                    result = pickle.load(f)
+                # Путь НЕ лежит в кеше (ключ - имя + содержимое, и две
+                # одинаковые копии файла делят запись) - подставляем
+                # актуальный путь этого вызова
+                result['files'].append(file_path)
+                return result
+            except FileNotFoundError:
+                pass
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning(f"Ignoring broken AST cache entry for {path}: {e}")
+
+            logger.debug(f"Parsing Python file: {path}")
+            # compile с PyCF_ONLY_AST вместо ast.parse: принимает bytes
+            # напрямую (кодировка по PEP 263), имя файла попадает в
+            # SyntaxError, а optimize=2 пропускает часть проверок
+            tree = compile(raw, file_path, 'exec', flags=ast.PyCF_ONLY_AST, optimize=2)
+            # Декодируем один раз - только для нарезки кода по строкам
+            content = raw.decode('utf-8')
+            _extract_python(tree, path, content, result)
+            # Сохраняем ДО добавления пути: в кеш попадает только то,
+            # что однозначно определяется ключом
+            _cache_store(cache_path, result)
+            result['files'].append(file_path)
+
+        # TODO: JS/TS парсинг через esprima или babel parser
+
+    except UnicodeDecodeError as e:
+        logger.error(f"Encoding error in {path}: {e}")
+    except SyntaxError as e:
+        logger.error(f"Syntax error in {path}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error parsing {path}: {e}")
+
+    return result
+
+
+def _extract_python(tree: ast.AST, file_path: Path, content: str, result: Dict[str, List]) -> None:
+    """Извлекает функции, классы и импорты из Python AST
+
+    Args:
+        tree: AST дерево
+        file_path: Путь к файлу
+        content: Содержимое файла
+        result: Dict, в который складываются functions/classes/imports
+    """
+    _Extractor(file_path, content, result).visit(tree)
+
+
+class _Extractor(ast.NodeVisitor):
+    """Извлекает функции, классы и импорты за ОДИН проход по дереву
+
+    Раньше _extract_python делал ast.walk по модулю, а для каждой
+    функции _extract_function запускал ast.walk еще раз за вызовами -
+    поддеревья методов и вложенных функций обходились многократно.
+    Визитор держит стек текущих функций: visit_Call/visit_Return
+    приписывают вызов и return самой внутренней функции, и каждый узел
+    посещается ровно один раз.
+    """
+
+    def __init__(self, file_path: Path, content: str, result: Dict[str, List]):
+        """Инициализация экстрактора
+
+        Args:
+            file_path: Путь к файлу
+            content: Содержимое файла
+            result: Dict, в который складываются functions/classes/imports
+        """
+        self.file_path = file_path
+        # Режем исходник на строки один раз на файл - раньше каждая
+        # функция заново сплитила весь content
+        self.lines = content.splitlines()
+        self.result = result
+        self._func_stack = []   # данные объемлющих функций (внутренняя - сверху)
+        self._class_stack = []  # (class_data, id() прямых детей тела класса)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._handle_function(node, is_async=False)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self._handle_function(node, is_async=True)
+
+    def _handle_function(self, node, is_async: bool) -> None:
+        """Записывает функцию и обходит ее тело с собой на стеке
+
+        Args:
+            node: AST узел функции
+            is_async: Асинхронная ли функция
+        """
+        func_data = _function_record(node, self.file_path, self.lines, is_async)
+        self.result['functions'].append(func_data)
+
+        # Метод - если функция лежит прямо в теле текущего класса
+        if self._class_stack:
+            class_data, body_ids = self._class_stack[-1]
+            if id(node) in body_ids:
+                class_data['methods'].append(func_data)
+
+        # calls/has_return заполняются при обходе тела
+        self._func_stack.append(func_data)
+        self.generic_visit(node)
+        self._func_stack.pop()
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        # Родительские классы
+        bases = []
+        for base in node.bases:
+            if isinstance(base, ast.Name):
+                bases.append(base.id)
+            elif isinstance(base, ast.Attribute):
+                bases.append(base.attr)
+
+        class_data = {
+            'name': sys.intern(node.name),
+            'file': sys.intern(self.file_path.name),
+            'line_start': node.lineno,
+            'line_end': node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
+            'methods': [],  # заполняется при обходе тела
+            'bases': bases,
+            'docstring': _docstring(node)
+        }
+        self.result['classes'].append(class_data)
+
+        self._class_stack.append((class_data, {id(item) for item in node.body}))
+        self.generic_visit(node)
+        self._class_stack.pop()
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if self._func_stack:
+            if isinstance(node.func, ast.Name):
+                self._func_stack[-1]['calls'].append(sys.intern(node.func.id))
+            elif isinstance(node.func, ast.Attribute):
+                self._func_stack[-1]['calls'].append(sys.intern(node.func.attr))
+        # Внутри аргументов могут быть вложенные вызовы
+        self.generic_visit(node)
+
+    def visit_Return(self, node: ast.Return) -> None:
+        if self._func_stack:
+            self._func_stack[-1]['has_return'] = True
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        _extract_import(node, self.file_path, self.result)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        _extract_import(node, self.file_path, self.result)
+
+
+def _function_record(node, file_path: Path, lines: List[str], is_async: bool) -> Dict:
+    """Собирает данные о функции из ее узла (без обхода тела)
+
+    calls и has_return стартуют пустыми - их заполняет _Extractor
+    по ходу единственного прохода по дереву.
+
+    Args:
+        node: AST узел функции
+        file_path: Путь к файлу
+        lines: Строки файла (общий список, режется один раз на файл)
+        is_async: Асинхронная ли функция
+
+    Returns:
+        Dict с данными функции
+    """
+    # Параметры
+    params = [arg.arg for arg in node.args.args]
+
+    # Return type annotation
+    return_type = None
+    if node.returns:
+        return_type = _UNPARSE(node.returns) if _UNPARSE else 'Any'
+
+    # Строки кода
+    line_start = node.lineno
+    line_end = node.end_lineno if hasattr(node, 'end_lineno') else line_start
+
+    # Извлекаем код функции
+    code = '\n'.join(lines[line_start - 1:line_end])
+
+    # Декораторы
+    decorators = []
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Name):
+            decorators.append(f"@{decorator.id}")
+        elif isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name):
+            decorators.append(f"@{decorator.func.id}")
+
+    return {
+        # intern: имена и файлы повторяются тысячами - одна копия в куче
+        'name': sys.intern(node.name),
+        'file': sys.intern(file_path.name),
+        'line_start': line_start,
+        'line_end': line_end,
+        'params': params,
+        'return_type': return_type,
+        'code': code,
+        'docstring': _docstring(node),
+        'calls': [],
+        'has_return': False,
+        'is_async': is_async,
+        'decorators': decorators
+    }
+
+
+def _extract_import(node: Union[ast.Import, ast.ImportFrom], file_path: Path, result: Dict[str, List]) -> None:
+    """Извлекает данные об импорте из AST и добавляет в result
+
+    Args:
+        node: AST узел импорта
+        file_path: Путь к файлу
+        result: Dict, в который складываются импорты
+    """
+    line = node.lineno
+
+    if isinstance(node, ast.Import):
+        # import module1, module2
+        # Для каждого модуля создаем отдельную запись
+        for alias in node.names:
+            result['imports'].append({
+                'file': sys.intern(file_path.name),
+                'line': line,
+                'module': sys.intern(alias.name),
+                'names': [sys.intern(alias.name)],
+                'alias': alias.asname
+            })
+    elif isinstance(node, ast.ImportFrom):
+        # from module import name1, name2
+        module = sys.intern(node.module or '')
+        names = [sys.intern(alias.name) for alias in node.names]
+        alias = node.names[0].asname if len(node.names) == 1 else None
+
+        result['imports'].append({
+            'file': sys.intern(file_path.name),
+            'line': line,
+            'module': module,
+            'names': names,
+            'alias': alias
+        })
+
 
 class CodeParser:
     """Алгоритмический парсер кода - читает файлы, строит AST, извлекает функции/классы/импорты"""
@@ -19,6 +398,7 @@ class CodeParser:
             project_path: Путь к проекту для анализа
         """
         self.project_path = Path(project_path)
+        self._path_by_name = None  # Ленивый индекс имя файла -> полный путь
         self.parsed_data = {
             'files': [],
             'functions': [],
@@ -30,6 +410,9 @@ class CodeParser:
     def parse_project(self) -> Dict[str, Any]:
         """Сканирует проект рекурсивно и парсит все поддерживаемые файлы
 
+        ast.parse - чистый CPU, поэтому на больших проектах файлы
+        раскладываются по пулу процессов и парсятся на всех ядрах.
+
         Returns:
             Dict со всеми распарсенными данными (files, functions, classes, imports, call_graph)
         """
@@ -37,17 +420,29 @@ class CodeParser:
         logger.info(f"Supported extensions: {Config.SUPPORTED_EXTENSIONS}")
         logger.info(f"Ignored directories: {Config.IGNORE_DIRS}")
 
+        source_files = _iter_source_files(str(self.project_path))
+
+        # Снимаем первые N путей - только чтобы решить, нужен ли пул,
+        # без материализации всего списка
+        head = list(itertools.islice(source_files, _PARALLEL_MIN_FILES))
+
         file_count = 0
-        for root, dirs, files in os.walk(self.project_path):
-            # Удаляем игнорируемые папки
-            dirs[:] = [d for d in dirs if d not in Config.IGNORE_DIRS]
-
-            for file in files:
-                if any(file.endswith(ext) for ext in Config.SUPPORTED_EXTENSIONS):
-                    file_path = Path(root) / file
-                    logger.debug(f"Parsing file: {file_path}")
-                    self.parse_file(file_path)
+        if len(head) >= _PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+            # Хвост генератора уходит в пул как есть: обход диска
+            # продолжается, пока воркеры уже парсят первые файлы -
+            # I/O перечисления перекрывается с CPU парсинга
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for result in executor.map(_parse_file_worker,
+                                           itertools.chain(head, source_files),
+                                           chunksize=16):
+                    self._merge_result(result)
                     file_count += 1
+        else:
+            # Маленький проект или одно ядро - пул не окупается.
+            # Хвост генератора дочитываем и здесь: head - только проба
+            for path in itertools.chain(head, source_files):
+                self._merge_result(_parse_file_worker(path))
+                file_count += 1
 
         logger.info(f"Parsed {file_count} files")
         logger.info(f"Total functions: {len(self.parsed_data['functions'])}")
@@ -56,200 +451,52 @@ class CodeParser:
 
         return self.parsed_data
 
-    def parse_file(self, file_path: Path) -> None:
-        """Читает и парсит один файл
+    def _merge_result(self, result: Dict[str, List]) -> None:
+        """Вливает результат парсинга одного файла в parsed_data
 
         Args:
-            file_path: Путь к файлу для парсинга
+            result: Результат от _parse_file_worker
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Проверка размера файла
-            if len(content.encode('utf-8')) > Config.MAX_FILE_SIZE:
-                logger.warning(f"File too large, skipping: {file_path}")
-                return  # Пропускаем слишком большие файлы
+        self.parsed_data['files'].extend(result.get('files', ()))
+        self.parsed_data['functions'].extend(result['functions'])
+        self.parsed_data['classes'].extend(result['classes'])
+        self.parsed_data['imports'].extend(result['imports'])
+        self._path_by_name = None  # Индекс имя -> путь устарел
 
-            # Парсинг Python
-            if file_path.suffix == '.py':
-                logger.debug(f"Parsing Python file: {file_path}")
-                tree = ast.parse(content)
-                self._extract_python(tree, file_path, content)
-
-            # TODO: JS/TS парсинг через esprima или babel parser
-
-        except UnicodeDecodeError as e:
-            logger.error(f"Encoding error in {file_path}: {e}")
-        except SyntaxError as e:
-            logger.error(f"Syntax error in {file_path}: {e}")
-        except Exception as e:
-            logger.exception(f"Unexpected error parsing {file_path}: {e}")
-
-    def _extract_python(self, tree: ast.AST, file_path: Path, content: str) -> None:
-        """Извлекает функции, классы и импорты из Python AST
+    def parse_file(self, file_path: Path) -> None:
+        """Читает и парсит один файл
 
         Args:
-            tree: AST дерево
-            file_path: Путь к файлу
-            content: Содержимое файла
+            file_path: Путь к файлу для парсинга
         """
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                func_data = self._extract_function(node, file_path, content)
-                self.parsed_data['functions'].append(func_data)
-            elif isinstance(node, ast.ClassDef):
-                class_data = self._extract_class(node, file_path, content)
-                self.parsed_data['classes'].append(class_data)
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                self._extract_import(node, file_path)
-
-    def _extract_function(self, node: ast.FunctionDef, file_path: Path, content: str) -> Dict:
-        """Извлекает данные о функции из AST
+        self._merge_result(_parse_file_worker(str(file_path)))
 
-        Args:
-            node: AST узел функции
-            file_path: Путь к файлу
-            content: Содержимое файла
+    def get_source(self, func: Dict) -> Optional[str]:
+        """Ленивая альтернатива func['code'] - читает диапазон строк с диска
 
-        Returns:
-            Dict с данными функции
-        """
-        # Имя функции
-        name = node.name
-
-        # Параметры
-        params = [arg.arg for arg in node.args.args]
-
-        # Return type annotation
-        return_type = None
-        if node.returns:
-            return_type = ast.unparse(node.returns) if hasattr(ast, 'unparse') else 'Any'
-
-        # Строки кода
-        line_start = node.lineno
-        line_end = node.end_lineno if hasattr(node, 'end_lineno') else line_start
-
-        # Извлекаем код функции
-        lines = content.split('\n')
-        code = '\n'.join(lines[line_start - 1:line_end])
-
-        # Docstring
-        docstring = ast.get_docstring(node)
-
-        # Вызовы других функций
-        calls = []
-        for sub_node in ast.walk(node):
-            if isinstance(sub_node, ast.Call):
-                if isinstance(sub_node.func, ast.Name):
-                    calls.append(sub_node.func.id)
-                elif isinstance(sub_node.func, ast.Attribute):
-                    calls.append(sub_node.func.attr)
-
-        # Async функция?
-        is_async = isinstance(node, ast.AsyncFunctionDef)
-
-        # Декораторы
-        decorators = []
-        for decorator in node.decorator_list:
-            if isinstance(decorator, ast.Name):
-                decorators.append(f"@{decorator.id}")
-            elif isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name):
-                decorators.append(f"@{decorator.func.id}")
-
-        return {
-            'name': name,
-            'file': str(file_path.name),
-            'line_start': line_start,
-            'line_end': line_end,
-            'params': params,
-            'return_type': return_type,
-            'code': code,
-            'docstring': docstring,
-            'calls': calls,
-            'is_async': is_async,
-            'decorators': decorators
-        }
-
-    def _extract_class(self, node: ast.ClassDef, file_path: Path, content: str) -> Dict:
-        """Извлекает данные о классе из AST
+        Позволяет потребителям не таскать исходник в памяти: по записи
+        функции достаются только нужные строки файла, без чтения целиком.
 
         Args:
-            node: AST узел класса
-            file_path: Путь к файлу
-            content: Содержимое файла
+            func: Dict функции с полями file, line_start, line_end
 
         Returns:
-            Dict с данными класса
+            Код функции или None, если файл не найден
         """
-        # Имя класса
-        name = node.name
-
-        # Строки кода
-        line_start = node.lineno
-        line_end = node.end_lineno if hasattr(node, 'end_lineno') else line_start
+        if self._path_by_name is None:
+            self._path_by_name = {Path(p).name: p for p in self.parsed_data['files']}
 
-        # Методы класса
-        methods = []
-        for item in node.body:
-            if isinstance(item, ast.FunctionDef):
-                method_data = self._extract_function(item, file_path, content)
-                methods.append(method_data)
+        path = self._path_by_name.get(func['file'])
+        if path is None:
+            return None
 
-        # Родительские классы
-        bases = []
-        for base in node.bases:
-            if isinstance(base, ast.Name):
-                bases.append(base.id)
-            elif isinstance(base, ast.Attribute):
-                bases.append(base.attr)
-
-        # Docstring
-        docstring = ast.get_docstring(node)
-
-        return {
-            'name': name,
-            'file': str(file_path.name),
-            'line_start': line_start,
-            'line_end': line_end,
-            'methods': methods,
-            'bases': bases,
-            'docstring': docstring
-        }
-
-    def _extract_import(self, node: Union[ast.Import, ast.ImportFrom], file_path: Path) -> None:
-        """Извлекает данные об импорте из AST и добавляет в parsed_data
-
-        Args:
-            node: AST узел импорта
-            file_path: Путь к файлу
-        """
-        line = node.lineno
-
-        if isinstance(node, ast.Import):
-            # import module1, module2
-            # Для каждого модуля создаем отдельную запись
-            for alias in node.names:
-                self.parsed_data['imports'].append({
-                    'file': str(file_path.name),
-                    'line': line,
-                    'module': alias.name,
-                    'names': [alias.name],
-                    'alias': alias.asname
-                })
-        elif isinstance(node, ast.ImportFrom):
-            # from module import name1, name2
-            module = node.module or ''
-            names = [alias.name for alias in node.names]
-            alias = node.names[0].asname if len(node.names) == 1 else None
-
-            self.parsed_data['imports'].append({
-                'file': str(file_path.name),
-                'line': line,
-                'module': module,
-                'names': names,
-                'alias': alias
-            })
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = list(itertools.islice(f, func['line_start'] - 1, func['line_end']))
+            return ''.join(lines).rstrip('\n')
+        except OSError as e:
+            logger.warning(f"Cannot read source for {func['name']}: {e}")
+            return None
 
     def build_call_graph(self) -> Dict[str, List[str]]:
         """Строит граф вызовов функций
@@ -1,13 +1,29 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response
 from pathlib import Path
 import json
 import os
 import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
 import logging
 from datetime import datetime
 
+try:
+    import diskcache  # Дисковое хранилище результатов (опционально)
+except ImportError:
+    diskcache = None
+
+try:
+    import orjson  # Быстрая сериализация многомегабайтного графа
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress  # gzip для больших ответов (опционально)
+except ImportError:
+    Compress = None
+
 # Добавляем родительскую директорию в path для импорта модулей
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -31,10 +47,56 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max upload
 
-# Хранилище для результатов анализа (в памяти)
-# В продакшене использовать Redis или БД
-analysis_results = {}
-analysis_progress = {}
+if Compress is not None:
+    Compress(app)
+
+# Хранилище для результатов анализа. С diskcache результаты лежат на
+# диске (переживают рестарт, не копят heap и работают при нескольких
+# воркерах); Cache dict-совместим, поэтому остальному коду все равно.
+# size_limit ограничивает рост: при переполнении старые записи
+# вытесняются прямо на записи (LRU). Без diskcache - прежний словарь
+# в памяти.
+_CACHE_ROOT = os.path.join(os.path.dirname(__file__), '..', 'cache')
+
+if diskcache is not None:
+    analysis_results = diskcache.Cache(os.path.join(_CACHE_ROOT, 'results'), size_limit=int(2e9))
+    analysis_progress = diskcache.Cache(os.path.join(_CACHE_ROOT, 'progress'), size_limit=int(1e8))
+else:
+    analysis_results = {}
+    analysis_progress = {}
+
+# Ограниченный пул для фоновых анализов: шквал POST /analyze больше не
+# спавнит по потоку на запрос - лишние запросы ждут в очереди пула,
+# а при переполнении очереди отклоняются с 429
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 2) // 2),
+    thread_name_prefix='analysis'
+)
+_MAX_PENDING = _EXECUTOR._max_workers * 2
+_pending_lock = threading.Lock()
+_pending_count = 0
+
+# Сериализованный JSON результатов по project_id: считается один раз
+# после анализа, /results отдает готовые байты без повторного jsonify
+analysis_results_bytes = {}
+
+# События для SSE: /progress-stream ждет на Event вместо того, чтобы
+# клиент долбил /progress опросом каждые N мс
+_progress_events = {}
+
+
+def _serialize_results(results) -> bytes:
+    """Сериализует результаты анализа в JSON bytes
+
+    Args:
+        results: Dict с результатами анализа
+
+    Returns:
+        JSON в виде bytes (orjson или stdlib fallback)
+    """
+    if orjson is not None:
+        return orjson.dumps(results)
+    return json.dumps(results, ensure_ascii=False).encode('utf-8')
 
 
 @app.route('/')
@@ -86,6 +148,14 @@ def analyze():
         logger.exception(f"Error in analyze endpoint (validation): {e}")
         return jsonify({'error': f'Validation error: {str(e)}'}), 400
 
+    # Backpressure: очередь пула заполнена - не принимаем новый анализ
+    global _pending_count
+    with _pending_lock:
+        if _pending_count >= _MAX_PENDING:
+            logger.warning(f"Analysis queue saturated ({_pending_count} pending), rejecting request")
+            return jsonify({'error': 'Server busy, try again later'}), 429
+        _pending_count += 1
+
     # Генерируем ID для проекта
     import uuid
     project_id = str(uuid.uuid4())
@@ -98,6 +168,7 @@ def analyze():
         'message': 'Starting analysis...',
         'progress': 0
     }
+    _progress_events[project_id] = threading.Event()
 
     # Запускаем анализ в отдельном потоке
     def run_analysis():
@@ -115,6 +186,7 @@ def analyze():
                     'message': message,
                     'progress': progress
                 }
+                _notify_progress(project_id)
 
             logger.info(f"[{project_id}] Calling analyze_project...")
             results = analyzer.analyze_project(project_path, progress_callback)
@@ -122,13 +194,15 @@ def analyze():
             logger.info(f"[{project_id}] Analysis completed successfully")
             logger.info(f"[{project_id}] Results keys: {results.keys() if results else 'None'}")
 
-            # Сохраняем результаты
+            # Сохраняем результаты + готовые байты для /results
             analysis_results[project_id] = results
+            analysis_results_bytes[project_id] = _serialize_results(results)
             analysis_progress[project_id] = {
                 'status': 'completed',
                 'message': 'Analysis complete!',
                 'progress': 100
             }
+            _notify_progress(project_id)
 
             logger.info(f"[{project_id}] === ANALYSIS FINISHED ===")
 
@@ -139,11 +213,14 @@ def analyze():
                 'message': str(e),
                 'progress': -1
             }
+            _notify_progress(project_id)
+        finally:
+            global _pending_count
+            with _pending_lock:
+                _pending_count -= 1
 
-    thread = threading.Thread(target=run_analysis)
-    thread.daemon = True
-    thread.start()
-    logger.info(f"[{project_id}] Analysis thread started")
+    _EXECUTOR.submit(run_analysis)
+    logger.info(f"[{project_id}] Analysis submitted to executor")
 
     return jsonify({
         'project_id': project_id,
@@ -151,6 +228,17 @@ def analyze():
     })
 
 
+def _notify_progress(project_id):
+    """Будит SSE-подписчиков проекта после обновления прогресса
+
+    Args:
+        project_id: ID проекта
+    """
+    event = _progress_events.get(project_id)
+    if event is not None:
+        event.set()
+
+
 @app.route('/progress/<project_id>')
 def get_progress(project_id):
     """
@@ -168,6 +256,38 @@ def get_progress(project_id):
     return jsonify(analysis_progress[project_id])
 
 
+@app.route('/progress-stream/<project_id>')
+def progress_stream(project_id):
+    """
+    SSE-поток прогресса: сервер пушит состояние при каждом изменении
+
+    Вместо опроса /progress каждые N мс клиент держит одно соединение
+    и получает событие только когда progress_callback реально сработал.
+    /progress остается для совместимости.
+
+    Yields: data: {"status": ..., "message": ..., "progress": ...}
+    """
+    if project_id not in analysis_progress:
+        return jsonify({'error': 'Unknown project'}), 404
+
+    def generate():
+        event = _progress_events.get(project_id)
+        while True:
+            state = analysis_progress.get(project_id, {})
+            yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+
+            if state.get('status') in ('completed', 'error') or event is None:
+                break
+
+            # Таймаут - страховка от потерянного set между yield и wait
+            event.wait(timeout=15)
+            event.clear()
+
+        _progress_events.pop(project_id, None)
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
 @app.route('/results/<project_id>')
 def get_results(project_id):
     """
@@ -180,10 +300,16 @@ def get_results(project_id):
         "stats": {...}
     }
     """
-    if project_id not in analysis_results:
-        return jsonify({'error': 'Results not found'}), 404
-
-    return jsonify(analysis_results[project_id])
+    body = analysis_results_bytes.get(project_id)
+    if body is None:
+        # Байты могли не пережить рестарт (в отличие от diskcache) -
+        # пересериализуем из хранилища один раз
+        if project_id not in analysis_results:
+            return jsonify({'error': 'Results not found'}), 404
+        body = _serialize_results(analysis_results[project_id])
+        analysis_results_bytes[project_id] = body
+
+    return Response(body, mimetype='application/json')
 
 
 @app.route('/config')
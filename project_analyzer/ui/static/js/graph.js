@@ -142,7 +142,7 @@ function startAnalysis(projectPath) {
         if (data.project_id) {
             showDebug('[9/10] ✓ Analysis started! ID: ' + data.project_id);
             currentProjectId = data.project_id;
-            pollProgress(data.project_id);
+            trackProgress(data.project_id);
         } else {
             showDebug('❌ No project_id in response!');
             showError('Failed to start analysis');
@@ -154,6 +154,38 @@ function startAnalysis(projectPath) {
     });
 }
 
+function trackProgress(projectId) {
+    // SSE: сервер сам пушит прогресс при каждом изменении - одно
+    // соединение вместо fetch каждые 500ms
+    if (typeof EventSource === 'undefined') {
+        pollProgress(projectId);
+        return;
+    }
+
+    showDebug('[9/10] Opening SSE stream /progress-stream/' + projectId);
+    const source = new EventSource(`/progress-stream/${projectId}`);
+
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        updateProgress(data);
+
+        if (data.status === 'completed') {
+            source.close();
+            loadResults(projectId);
+        } else if (data.status === 'error') {
+            source.close();
+            showError(data.message);
+        }
+    };
+
+    source.onerror = () => {
+        // SSE не взлетел (прокси, старый браузер) - откат на опрос
+        source.close();
+        showDebug('[9/10] SSE failed, falling back to polling');
+        pollProgress(projectId);
+    };
+}
+
 function pollProgress(projectId) {
     const interval = setInterval(() => {
         fetch(`/progress/${projectId}`)
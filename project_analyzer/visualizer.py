@@ -5,6 +5,12 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Ранги серьезности: error перекрывает warning, warning перекрывает info
+_SEVERITY_RANK = {'error': 3, 'warning': 2, 'info': 1}
+
+# Ранг -> цвет ноды (0 = проблем нет)
+_RANK_COLORS = {3: '#F44336', 2: '#FF9800', 1: '#2196F3', 0: '#4CAF50'}
+
 
 class DataVisualizer:
     """Подготавливает данные для UI - граф, дерево файлов, список проблем"""
@@ -22,6 +28,15 @@ class DataVisualizer:
         self.functions = descriptions  # функции с описаниями
         self.classes = parsed_data['classes']
 
+        # Худшая серьезность по имени функции - один проход по issues
+        # вместо полного скана списка на каждую ноду (O(F+I) вместо O(F*I))
+        self._severity_by_func = {}
+        for issue in self.issues:
+            name = issue.get('function')
+            rank = _SEVERITY_RANK.get(issue['severity'], 0)
+            if rank > self._severity_by_func.get(name, 0):
+                self._severity_by_func[name] = rank
+
         logger.info(f"DataVisualizer initialized:")
         logger.info(f"  - Functions to visualize: {len(self.functions)}")
         logger.info(f"  - Classes: {len(self.classes)}")
@@ -49,23 +64,7 @@ class DataVisualizer:
         Returns:
             Hex цвет для ноды
         """
-        func_issues = [
-            issue for issue in self.issues
-            if issue.get('function') == func['name']
-        ]
-
-        if not func_issues:
-            return '#4CAF50'  # Зеленый - все ок
-
-        # Приоритет: error > warning > info
-        severities = [issue['severity'] for issue in func_issues]
-
-        if 'error' in severities:
-            return '#F44336'  # Красный
-        elif 'warning' in severities:
-            return '#FF9800'  # Оранжевый
-        else:
-            return '#2196F3'  # Синий
+        return _RANK_COLORS[self._severity_by_func.get(func['name'], 0)]
 
     def prepare_graph_data(self) -> Dict[str, Any]:
         """Создает nodes и edges для визуализации графа (формат для vis.js)
@@ -79,6 +78,10 @@ class DataVisualizer:
 
         logger.info(f"  - Processing {len(self.functions)} functions for nodes...")
 
+        # Мапинг имя функции -> все уникальные ID (строится в том же
+        # проходе, что и ноды - без второго цикла по functions)
+        func_name_to_ids = {}
+
         # Создаем ноды для функций
         for i, func in enumerate(self.functions):
             # Определяем цвет по проблемам
@@ -86,6 +89,7 @@ class DataVisualizer:
 
             # Уникальный ID: file:function_name
             unique_id = f"{func['file']}:{func['name']}"
+            func_name_to_ids.setdefault(func['name'], []).append(unique_id)
 
             node = {
                 'id': unique_id,
@@ -108,41 +112,39 @@ class DataVisualizer:
                 logger.info(f"    Node {i+1}: {unique_id} (color: {color})")
 
         logger.info(f"  - Created {len(nodes)} nodes")
-
-        # Создаем ребра (вызовы)
-        # Сначала создаем мапинг имя функции -> все уникальные ID
-        logger.info("  - Building function name mapping for edges...")
-        func_name_to_ids = {}
-        for func in self.functions:
-            name = func['name']
-            unique_id = f"{func['file']}:{name}"
-            if name not in func_name_to_ids:
-                func_name_to_ids[name] = []
-            func_name_to_ids[name].append(unique_id)
-
         logger.info(f"  - Function mapping has {len(func_name_to_ids)} unique function names")
 
         # Теперь создаем ребра
         logger.info("  - Creating edges from function calls...")
-        edge_count = 0
+        seen_edges = set()  # повторный вызов в теле не плодит дубликаты ребер
         for func in self.functions:
             from_id = f"{func['file']}:{func['name']}"
+            file_prefix = f"{func['file']}:"
             calls = func.get('calls', [])
 
             for called in calls:
                 # Находим все возможные узлы с таким именем
-                if called in func_name_to_ids:
-                    for to_id in func_name_to_ids[called]:
-                        edges.append({
-                            'from': from_id,
-                            'to': to_id,
-                            'arrows': 'to',
-                            'color': {'color': '#666666'}
-                        })
-                        edge_count += 1
-
-                        if edge_count <= 3:
-                            logger.info(f"    Edge {edge_count}: {from_id} -> {to_id}")
+                targets = func_name_to_ids.get(called)
+                if not targets:
+                    continue
+
+                # Одноименных целей может быть много (например __init__) -
+                # если есть цель в том же файле, статически она вероятнее
+                # всех остальных, и кросс-файловые дубли не рисуем
+                same_file = [t for t in targets if t.startswith(file_prefix)]
+                for to_id in (same_file or targets):
+                    if (from_id, to_id) in seen_edges:
+                        continue
+                    seen_edges.add((from_id, to_id))
+                    edges.append({
+                        'from': from_id,
+                        'to': to_id,
+                        'arrows': 'to',
+                        'color': {'color': '#666666'}
+                    })
+
+                    if len(edges) <= 3:
+                        logger.info(f"    Edge {len(edges)}: {from_id} -> {to_id}")
 
         logger.info(f"  - Created {len(edges)} edges")
 
@@ -161,33 +163,37 @@ class DataVisualizer:
         Returns:
             List деревьев файлов
         """
-        tree = {}
-
-        for func in self.functions:
-            file_path = func['file']
+        # Итоговые ноды строятся сразу - без промежуточного вложенного
+        # dict и рекурсивной конвертации вторым деревом
+        roots = []
+        index = {'': (roots, {})}  # путь -> (children родителя, имя -> нода)
+
+        # Только уникальные пути (в порядке появления) - раньше дерево
+        # прошивалось заново для каждой функции одного файла
+        for file_path in dict.fromkeys(f['file'] for f in self.functions):
             parts = Path(file_path).parts
-
-            # Строим вложенную структуру
-            current = tree
-            for part in parts:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-
-        # Конвертируем в список для UI
-        def dict_to_tree(d, parent=''):
-            result = []
-            for key, value in d.items():
-                node = {
-                    'name': key,
-                    'path': f"{parent}/{key}" if parent else key,
-                    'type': 'folder' if value else 'file',
-                    'children': dict_to_tree(value, f"{parent}/{key}") if value else []
-                }
-                result.append(node)
-            return result
-
-        return dict_to_tree(tree)
+            last = len(parts) - 1
+
+            parent = ''
+            for i, part in enumerate(parts):
+                children, by_name = index[parent]
+                path = f"{parent}/{part}" if parent else part
+
+                node = by_name.get(part)
+                if node is None:
+                    node = {
+                        'name': part,
+                        'path': path,
+                        'type': 'file' if i == last else 'folder',
+                        'children': []
+                    }
+                    by_name[part] = node
+                    children.append(node)
+                    index[path] = (node['children'], {})
+
+                parent = path
+
+        return roots
 
     def prepare_issues_list(self) -> Dict[str, List[Dict]]:
         """Группирует проблемы по типам